@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for the Stark print server.
+
+    gunicorn -c gunicorn.conf.py server:app
+
+job_queue and job_history live inside the server process, so run a
+single worker and get concurrent uploads from its threads.
+"""
+
+bind = "0.0.0.0:5000"     # keep in sync with SERVER_HOST/SERVER_PORT in server.py
+workers = 1
+worker_class = "gthread"
+threads = 40
+# heartbeat: the arbiter restarts a worker whose main loop is silent this
+# long (gthread requests run on other threads, so this is not a request limit)
+timeout = 120
+# worker_exit waits up to SHUTDOWN_TIMEOUT (server.py) for in-flight batches,
+# then kills the workers still busy and their soffice (up to 10s each); keep
+# this above both or the arbiter SIGKILLs the server before it is done.
+# (Not imported from server.py: importing it starts the workers.)
+graceful_timeout = 180
+
+
+def worker_exit(server, worker):
+    # finish in-flight batches and stop the workers and their LibreOffice instances
+    from server import shutdown_workers
+    shutdown_workers()
@@ -1,35 +1,63 @@
 #!/usr/bin/env python3
 """
 Stark Print Server
-- Flask upload endpoint
-- FIFO queue with worker threads
-- LibreOffice headless conversion for docx/pptx/xlsx -> PDF
+- Flask upload endpoint, served by gunicorn (gunicorn -c gunicorn.conf.py server:app)
+- FIFO queue dispatched in batches to a pool of worker processes, each
+  owning one LibreOffice instance
+- LibreOffice conversion for docx/pptx/xlsx -> PDF via a persistent
+  soffice UNO listener (falls back to one-shot headless runs without pyuno)
 - Print via lp (CUPS)
 - Optional LAN-only restrictions via ALLOWED_NETWORKS (CIDR)
 """
 
 import os
 import io
+import errno
 import sys
 import time
 import shutil
+import signal
 import logging
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
 import tempfile
+import zipfile
+import mmap
+import struct
 import threading
 import queue
+import bisect
+import uuid
+import multiprocessing
+import multiprocessing.connection
 import subprocess
-from datetime import datetime
-from ipaddress import ip_network, ip_address
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from ipaddress import ip_network, ip_address, collapse_addresses
 
-from flask import Flask, request, jsonify, abort
+from flask import Flask, Request, request, jsonify, abort
 from werkzeug.utils import secure_filename
 
+# LibreOffice UNO bridge (python3-uno); without it we cold-start soffice per job
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except ImportError:
+    uno = None
+
+# CUPS client library (pycups); without it every job forks lp
+try:
+    import cups
+except ImportError:
+    cups = None
+
 # ----------------------
 # Configuration
 # ----------------------
 UPLOAD_FOLDER = "/var/lib/stark/uploads"       # must be writable by service user
 WORK_FOLDER = "/var/lib/stark/work"            # temp working folder
 LOG_FILE = "/var/log/stark_server.log"
+HISTORY_FILE = "/var/lib/stark/history.bin"   # job history ring (kept out of WORK_FOLDER's sweeps)
 
 SERVER_HOST = "0.0.0.0"                        # listen address (0.0.0.0 ok for LAN)
 SERVER_PORT = 5000
@@ -42,11 +70,39 @@ ALLOWED_NETWORKS = ["192.168.0.0/16", "10.0.0.0/8"]
 PRINTER_NAME = None   # e.g. "HP_LaserJet" or None to use system default
 
 # limits & behaviour
-ALLOWED_EXTENSIONS = {"pdf", "docx", "pptx", "xlsx"}
+ALLOWED_EXTENSIONS = frozenset({"pdf", "docx", "pptx", "xlsx"})
 MAX_FILE_SIZE_MB = 50        # reject uploads bigger than this
-WORKER_COUNT = 1             # number of worker threads (1 enforces strict FIFO)
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # buffer size when writing uploads to disk
+WORKER_COUNT = 2             # worker processes, one LibreOffice instance each (1 enforces strict FIFO)
 CONVERT_TIMEOUT = 60         # seconds allowed for libreoffice conversion
 PRINT_TIMEOUT = 30           # seconds allowed for lp command
+HISTORY_SIZE = 200           # job history entries kept (older ones are overwritten)
+WORK_MAX_AGE = 3600          # seconds before leftovers in WORK_FOLDER (and upload spools) are swept
+SWEEP_INTERVAL = 600         # seconds between sweeps
+# Long PDFs can be split with qpdf and submitted as concurrent CUPS jobs.
+# The chunks are separate jobs and may leave the printer out of order,
+# so this is off unless a page threshold is set.
+PRINT_SPLIT_THRESHOLD = 0    # split PDFs with more pages than this (0 disables)
+PRINT_SPLIT_CHUNK = 10       # pages per chunk
+PRINT_FANOUT = 4             # chunks submitted at once
+BATCH_SIZE = 10              # max queued jobs a worker converts together
+MAX_BATCH_WAIT_MS = 200      # how long a worker waits to fill a batch
+SHUTDOWN_TIMEOUT = 120       # seconds in-flight batches get to finish on shutdown (see gunicorn.conf.py)
+
+# LibreOffice listener
+SOFFICE_BIN = "soffice"
+UNO_HOST = "127.0.0.1"
+UNO_PORT = 2002              # instance N listens on UNO_PORT + N
+UNO_PROFILE_ROOT = "/var/lib/stark"   # profiles live in uno_profile_N below this
+SOFFICE_START_TIMEOUT = 30   # seconds to wait for the listener to accept connections
+SOFFICE_MAX_CONVERSIONS = 50 # restart the listener after this many conversions
+
+# PDF export filter per input type
+PDF_EXPORT_FILTERS = {
+    "docx": "writer_pdf_Export",
+    "pptx": "impress_pdf_Export",
+    "xlsx": "calc_pdf_Export",
+}
 
 # ----------------------
 # Setup
@@ -54,47 +110,134 @@ PRINT_TIMEOUT = 30           # seconds allowed for lp command
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(WORK_FOLDER, exist_ok=True)
 
-# Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Worker processes are forked so they inherit configuration without
+# re-importing this module (spawn/forkserver would rerun the startup code).
+mp = multiprocessing.get_context("fork")
+
+# Logging: every process only enqueues records; a listener thread in the
+# server process does the file/console I/O. WatchedFileHandler reopens the
+# log after logrotate moves it.
+log_queue = mp.Queue()
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter("%(message)s"))  # listener adds the prefix
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+log_handlers = [WatchedFileHandler(LOG_FILE), logging.StreamHandler(sys.stdout)]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+log_listener = QueueListener(log_queue, *log_handlers)
 logger = logging.getLogger("stark")
 
+# spool files of uploads still being received (see sweep_work_folder)
+UPLOAD_SPOOL_PREFIX = ".upload-"
+
+class StarkRequest(Request):
+    """Spool uploaded files straight into UPLOAD_FOLDER so saving them is a hardlink."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, prefix=UPLOAD_SPOOL_PREFIX)
+
 app = Flask(__name__)
+app.request_class = StarkRequest
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE_MB * 1024 * 1024
 
-# job queue and history
+# job queue (upload -> dispatcher) and history events (workers -> server)
 job_queue = queue.Queue()
-job_history = []  # in-memory short history (could be persisted)
+event_queue = mp.Queue()
+
+# futures of dispatched jobs, by job id, until their batch finishes
+job_futures = {}
+# job_history (HistoryLog) is set up with the helpers below
+
+# finished work dirs waiting to be deleted by the server process
+cleanup_queue = mp.Queue()
 
 
 
 # ----------------------
 # Utility helpers
 # ----------------------
+def compile_networks(networks):
+    """
+    Parse CIDR strings once into sorted, non-overlapping integer ranges,
+    keyed by IP version: {version: (starts, ends)}.
+    """
+    parsed = {4: [], 6: []}
+    for net in networks:
+        try:
+            network = ip_network(net)
+        except ValueError:
+            logger.warning(f"Ignoring invalid network {net!r} in ALLOWED_NETWORKS")
+            continue
+        parsed[network.version].append(network)
+    ranges = {}
+    for version, nets in parsed.items():
+        collapsed = list(collapse_addresses(nets))
+        ranges[version] = (
+            [int(n.network_address) for n in collapsed],
+            [int(n.broadcast_address) for n in collapsed],
+        )
+    return ranges
+
+# ALLOWED_NETWORKS as integer ranges, looked up on every request
+allowed_ranges = compile_networks(ALLOWED_NETWORKS)
+
 def ip_allowed(remote_addr):
     """Check if remote_addr (string) is inside ALLOWED_NETWORKS."""
     try:
         ip = ip_address(remote_addr)
     except Exception:
         return False
-    for net in ALLOWED_NETWORKS:
-        try:
-            if ip in ip_network(net):
-                return True
-        except Exception:
-            continue
-    return False
+    starts, ends = allowed_ranges[ip.version]
+    value = int(ip)
+    i = bisect.bisect_right(starts, value) - 1
+    return i >= 0 and value <= ends[i]
+
+def file_ext(filename):
+    """Lowercased extension without the dot ("" if there is none)."""
+    return os.path.splitext(filename)[1][1:].lower()
+
+# ".pdf", ".docx", ... for a single C-level endswith check
+ALLOWED_SUFFIXES = tuple("." + ext for ext in sorted(ALLOWED_EXTENSIONS))
 
 def allowed_file(filename):
-    ext = filename.rsplit(".", 1)
-    return len(ext) == 2 and ext[1].lower() in ALLOWED_EXTENSIONS
+    return filename.lower().endswith(ALLOWED_SUFFIXES)
+
+def link_or_copy(src, dst):
+    """
+    Hardlink src to dst when both are on one filesystem, otherwise copy.
+    copyfile rather than copy: no chmod, and the data moves via sendfile(2).
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+# os.link errors that mean "can't hardlink here", as opposed to real failures
+LINK_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+def save_upload(f, save_path):
+    """
+    Persist an uploaded FileStorage at save_path. The body was already
+    spooled into UPLOAD_FOLDER by StarkRequest, so link that file in place;
+    the spool name itself goes away when the request closes it. Streams
+    without a backing file, or on filesystems without hardlinks, are
+    copied. An existing save_path is never overwritten (FileExistsError):
+    it may be another job's upload, linked to the same inode.
+    """
+    spool = getattr(f.stream, "name", None)
+    if isinstance(spool, str):
+        f.stream.flush()
+        try:
+            os.link(spool, save_path)
+            return
+        except OSError as e:
+            if e.errno not in LINK_UNSUPPORTED:
+                raise
+            f.stream.seek(0)
+    with open(save_path, 'xb') as out:
+        shutil.copyfileobj(f.stream, out, UPLOAD_CHUNK_SIZE)
 
 def run_subprocess(cmd, timeout=None):
     """Run subprocess and return (returncode, stdout, stderr)."""
@@ -106,26 +249,350 @@ def run_subprocess(cmd, timeout=None):
     except Exception as e:
         return -1, "", str(e)
 
-def convert_to_pdf(input_path, out_dir):
-    """
-    Convert docx/pptx/xlsx to PDF using libreoffice headless.
-    Returns path to PDF on success, or raises Exception.
-    """
-    # libreoffice converts based on working dir and outputs with same base name
-    cmd = [
-        "libreoffice", "--headless", "--invisible",
-        "--convert-to", "pdf", "--outdir", out_dir, input_path
-    ]
-    code, out, err = run_subprocess(cmd, timeout=CONVERT_TIMEOUT)
-    if code != 0:
-        raise RuntimeError(f"LibreOffice failed: {err or out}")
+def pdf_path_for(input_path, out_dir):
+    """LibreOffice writes <basename>.pdf into the output dir."""
     base = os.path.splitext(os.path.basename(input_path))[0]
-    pdf_path = os.path.join(out_dir, base + ".pdf")
+    return os.path.join(out_dir, base + ".pdf")
+
+def check_pdf(pdf_path):
     if not os.path.exists(pdf_path):
         raise RuntimeError(f"Conversion did not produce PDF: expected {pdf_path}")
     return pdf_path
 
-def print_pdf(pdf_path):
+def kill_group(pgid):
+    """SIGKILL a process group, ignoring one that is already gone."""
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except OSError:
+        pass
+
+def uno_props(**kwargs):
+    """Build a tuple of UNO PropertyValues from keyword arguments."""
+    props = []
+    for name, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+class OfficeInstance:
+    """
+    One LibreOffice instance with its own user profile.
+    With pyuno available, soffice stays resident as a UNO listener and is
+    restarted when it stops answering or after SOFFICE_MAX_CONVERSIONS
+    (long-lived instances slow down). Without pyuno each conversion runs a
+    one-shot headless soffice against the same profile.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.port = UNO_PORT + index
+        self.profile = os.path.join(UNO_PROFILE_ROOT, f"uno_profile_{index}")
+        self.proc = None
+        self.desktop = None
+        self.conversions = 0
+
+    def profile_arg(self):
+        return f"-env:UserInstallation=file://{self.profile}"
+
+    @property
+    def pidfile(self):
+        return self.profile + ".pid"
+
+    def kill_stale(self):
+        """
+        Kill a listener left on this port/profile by a worker that died
+        without stopping it (its replacement would collide with it).
+        """
+        try:
+            with open(self.pidfile) as f:
+                pid = int(f.read())
+        except (OSError, ValueError):
+            return
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                ours = self.profile_arg().encode() in f.read()
+        except OSError:
+            # the launcher is gone; its process group only survives through
+            # soffice children that we started
+            ours = True
+        if ours:
+            logger.warning(f"Killing stale soffice listener {self.index} (pgid {pid})")
+            kill_group(pid)
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                try:
+                    os.killpg(pid, 0)
+                except OSError:
+                    break
+                time.sleep(0.1)
+        try:
+            os.remove(self.pidfile)
+        except OSError:
+            pass
+
+    def start(self):
+        if uno is None:
+            return
+        cmd = [
+            SOFFICE_BIN, "--headless", "--invisible", "--nologo", "--norestore",
+            self.profile_arg(),
+            f"--accept=socket,host={UNO_HOST},port={self.port};urp;StarOffice.ComponentContext",
+        ]
+        self.kill_stale()
+        logger.info(f"Starting soffice listener {self.index} on port {self.port}")
+        # own process group, so the launcher and soffice.bin are stopped together
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                     start_new_session=True)
+        with open(self.pidfile, "w") as f:
+            f.write(str(self.proc.pid))
+        try:
+            self.desktop = self._connect()
+        except Exception:
+            self.stop()
+            raise
+        self.conversions = 0
+
+    def _connect(self):
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        url = f"uno:socket,host={UNO_HOST},port={self.port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + SOFFICE_START_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(url)
+                break
+            except NoConnectException:
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"soffice listener on port {self.port} did not come up")
+                time.sleep(0.25)
+        return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+    def stop(self):
+        # no desktop.terminate(): it can hang like any UNO call, and soffice
+        # shuts down cleanly on SIGTERM anyway
+        if self.proc is not None:
+            try:
+                os.killpg(self.proc.pid, signal.SIGTERM)
+                self.proc.wait(timeout=10)
+            except OSError:
+                pass
+            except subprocess.TimeoutExpired:
+                kill_group(self.proc.pid)
+                self.proc.wait()
+            kill_group(self.proc.pid)  # anything left of the group
+            try:
+                os.remove(self.pidfile)
+            except OSError:
+                pass
+        self.proc = None
+        self.desktop = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def watchdog(self, timeout):
+        """
+        Start a timer that kills this soffice after timeout seconds; UNO
+        calls cannot time out on their own. Cancel it when the calls are done.
+        """
+        timer = threading.Timer(timeout, kill_group, (self.proc.pid,))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def ping(self):
+        """Return True if the listener is alive and answering over UNO."""
+        if self.proc is None or self.proc.poll() is not None:
+            return False
+        # a healthy listener answers at once; a hung one is killed
+        watchdog = self.watchdog(SOFFICE_START_TIMEOUT)
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+        finally:
+            watchdog.cancel()
+
+    def convert(self, input_path, out_dir):
+        """Convert input_path into out_dir and return the PDF path."""
+        result = self.convert_many([input_path], out_dir)[input_path]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def convert_many(self, input_paths, out_dir):
+        """
+        Convert several files into out_dir in one go.
+        Returns {input_path: pdf_path or the Exception that file hit}.
+        """
+        if uno is None:
+            return self._convert_cli_batch(input_paths, out_dir)
+        results = {}
+        for input_path in input_paths:
+            pdf_path = pdf_path_for(input_path, out_dir)
+            try:
+                self._convert_uno(input_path, pdf_path)
+                results[input_path] = check_pdf(pdf_path)
+            except Exception as e:
+                results[input_path] = e
+        return results
+
+    def _convert_cli_batch(self, input_paths, out_dir):
+        try:
+            self._convert_cli(input_paths, out_dir)
+        except RuntimeError as e:
+            if len(input_paths) == 1:
+                return {input_paths[0]: e}
+            # split so a single bad document doesn't fail the whole batch
+            mid = len(input_paths) // 2
+            results = self._convert_cli_batch(input_paths[:mid], out_dir)
+            results.update(self._convert_cli_batch(input_paths[mid:], out_dir))
+            return results
+        results = {}
+        for input_path in input_paths:
+            try:
+                results[input_path] = check_pdf(pdf_path_for(input_path, out_dir))
+            except RuntimeError as e:
+                results[input_path] = e
+        return results
+
+    def _convert_cli(self, input_paths, out_dir):
+        cmd = [
+            SOFFICE_BIN, "--headless", "--invisible", self.profile_arg(),
+            "--convert-to", "pdf", "--outdir", out_dir, *input_paths
+        ]
+        code, out, err = run_subprocess(cmd, timeout=CONVERT_TIMEOUT * len(input_paths))
+        if code != 0:
+            raise RuntimeError(f"LibreOffice failed: {err or out}")
+
+    def _convert_uno(self, input_path, pdf_path):
+        if self.conversions >= SOFFICE_MAX_CONVERSIONS or not self.ping():
+            self.restart()
+        ext = file_ext(input_path)
+        watchdog = self.watchdog(CONVERT_TIMEOUT)
+        doc = None
+        try:
+            doc = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+                uno_props(Hidden=True))
+            doc.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                uno_props(FilterName=PDF_EXPORT_FILTERS.get(ext, "writer_pdf_Export")))
+        except Exception as e:
+            if not watchdog.is_alive():
+                raise RuntimeError(f"LibreOffice timed out after {CONVERT_TIMEOUT}s")
+            raise RuntimeError(f"LibreOffice failed: {e}")
+        finally:
+            # closing is a UNO call too, so it runs under the watchdog
+            if doc is not None:
+                try:
+                    doc.close(True)
+                except Exception:
+                    pass
+            watchdog.cancel()
+            self.conversions += 1
+
+# free LibreOffice instances in this worker process; a conversion holds one
+office_pool = queue.Queue()
+
+# set in each worker process by init_worker
+worker_id = None
+
+# CUPS connection of the calling thread (.conn), opened on its first print;
+# pycups connections are not thread-safe, and split_and_print's threads
+# each submit over their own
+cups_local = threading.local()
+
+def convert_to_pdf(input_path, out_dir):
+    """
+    Convert docx/pptx/xlsx to PDF on a free LibreOffice instance.
+    Returns path to PDF on success, or raises Exception.
+    """
+    instance = office_pool.get()
+    try:
+        return instance.convert(input_path, out_dir)
+    finally:
+        office_pool.put(instance)
+
+def convert_batch_to_pdf(input_paths, out_dir):
+    """
+    Convert several docx/pptx/xlsx files on one LibreOffice instance.
+    Returns {input_path: pdf_path or Exception}.
+    """
+    instance = office_pool.get()
+    try:
+        return instance.convert_many(input_paths, out_dir)
+    finally:
+        office_pool.put(instance)
+
+def cups_submit(conn, pdf_path, title):
+    """Open a connection if needed and submit. Returns (conn, printer, cups_job_id)."""
+    if conn is None:
+        conn = cups.Connection()
+    printer = PRINTER_NAME or conn.getDefault()
+    if not printer:
+        return conn, None, None
+    return conn, printer, conn.printFile(printer, pdf_path, title, {})
+
+def call_with_timeout(func, *args, timeout):
+    """
+    Run func on a helper thread and wait at most timeout seconds; raises
+    TimeoutError if it hasn't returned (the thread is left to finish alone).
+    """
+    result = {}
+
+    def run():
+        try:
+            result["value"] = func(*args)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError(f"no response within {timeout}s")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+def print_pdf(pdf_path, title=None):
+    """
+    Send PDF to the printer. Return (success_bool, message).
+    Uses this thread's CUPS connection when pycups is available, else lp.
+    Either way the submission is bounded by PRINT_TIMEOUT.
+    """
+    if cups is None:
+        return print_pdf_lp(pdf_path)
+    error = None
+    conn = getattr(cups_local, "conn", None)
+    for _ in range(2):
+        try:
+            conn, printer, cups_job = call_with_timeout(
+                cups_submit, conn, pdf_path, title or os.path.basename(pdf_path),
+                timeout=PRINT_TIMEOUT)
+        except TimeoutError as e:
+            # cupsd is stalled; leave that connection to the stuck call
+            # and don't resubmit (the job may still go through)
+            cups_local.conn = None
+            return False, f"CUPS timed out: {e}"
+        except (cups.IPPError, RuntimeError) as e:
+            # the connection may have gone stale (cupsd restart); reconnect once
+            conn = cups_local.conn = None
+            error = e
+            continue
+        cups_local.conn = conn
+        if not printer:
+            return False, "No default printer configured"
+        return True, f"request id is {printer}-{cups_job}"
+    return False, str(error)
+
+def print_pdf_lp(pdf_path):
     """Send PDF to printer with lp. Return (success_bool, message)."""
     cmd = ["lp"]
     if PRINTER_NAME:
@@ -136,92 +603,556 @@ def print_pdf(pdf_path):
         return False, err or out
     return True, out.strip()
 
+def pdf_page_count(pdf_path):
+    """Page count via qpdf, or 0 if it can't be determined."""
+    code, out, err = run_subprocess(["qpdf", "--show-npages", pdf_path], timeout=PRINT_TIMEOUT)
+    out = out.strip()
+    return int(out) if code == 0 and out.isdigit() else 0
+
+def split_and_print(pdf_path, title=None):
+    """
+    Split pdf_path into PRINT_SPLIT_CHUNK-page files with qpdf and submit
+    them PRINT_FANOUT at a time. Return (success_bool, message) like print_pdf.
+    """
+    title = title or os.path.basename(pdf_path)
+    tmpdir = tempfile.mkdtemp(dir=WORK_FOLDER)
+    try:
+        # qpdf replaces %d with the zero-padded page range, so names sort in page order
+        cmd = ["qpdf", f"--split-pages={PRINT_SPLIT_CHUNK}", pdf_path,
+               os.path.join(tmpdir, "chunk_%d.pdf")]
+        code, out, err = run_subprocess(cmd, timeout=CONVERT_TIMEOUT)
+        if code not in (0, 3):  # 3 = succeeded with warnings
+            logger.warning(f"qpdf split failed, printing {title} as one job: {err or out}")
+            return print_pdf(pdf_path, title)
+        chunks = [os.path.join(tmpdir, name) for name in sorted(os.listdir(tmpdir))]
+        with ThreadPoolExecutor(max_workers=PRINT_FANOUT) as pool:
+            results = list(pool.map(
+                lambda args: print_pdf(args[1], f"{title} ({args[0]}/{len(chunks)})"),
+                enumerate(chunks, 1)))
+        ok = all(result_ok for result_ok, _ in results)
+        return ok, "; ".join(msg for _, msg in results)
+    finally:
+        cleanup_queue.put(tmpdir)
+
+def print_document(pdf_path, title=None):
+    """Print pdf_path, fanning long documents out over several jobs when enabled."""
+    if PRINT_SPLIT_THRESHOLD and pdf_page_count(pdf_path) > PRINT_SPLIT_THRESHOLD:
+        return split_and_print(pdf_path, title)
+    return print_pdf(pdf_path, title)
+
+def format_timestamp(ns):
+    """ISO-8601 UTC string for a time.time_ns() value."""
+    # integer split: a float of ns since the epoch can't hold microseconds exactly
+    seconds, nanos = divmod(ns, 10**9)
+    dt = datetime.fromtimestamp(seconds, timezone.utc).replace(microsecond=nanos // 1000)
+    return dt.isoformat().replace("+00:00", "Z")
+
+# history record: timestamp_ns, job_id, filename, status, client, error/printer_response
+HISTORY_HEADER = struct.Struct("<Q")  # number of records ever written
+HISTORY_RECORD = struct.Struct("<q24s96s20s40s160s")
+
+def pack_str(value, size):
+    return (value or "").encode("utf-8")[:size]
+
+def unpack_str(raw):
+    return raw.rstrip(b"\0").decode("utf-8", "ignore")
+
+class HistoryLog:
+    """
+    Job history as a ring of fixed-size packed records in an mmap'd file.
+    Appending costs no Python objects per job and the history survives
+    restarts. Strings longer than their field are truncated.
+    """
+
+    def __init__(self, path, slots):
+        self.slots = slots
+        size = HISTORY_HEADER.size + slots * HISTORY_RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                # new file, or HISTORY_SIZE / the record layout changed: start over
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.count = HISTORY_HEADER.unpack_from(self.map, 0)[0]
+        self.lock = threading.Lock()
+
+    def append(self, entry):
+        detail = entry.get("error") or entry.get("printer_response")
+        with self.lock:
+            slot = self.count % self.slots
+            HISTORY_RECORD.pack_into(
+                self.map, HISTORY_HEADER.size + slot * HISTORY_RECORD.size,
+                entry["timestamp"],
+                pack_str(entry["job_id"], 24),
+                pack_str(entry["filename"], 96),
+                pack_str(entry["status"], 20),
+                pack_str(entry.get("client"), 40),
+                pack_str(detail and str(detail), 160),
+            )
+            self.count += 1
+            HISTORY_HEADER.pack_into(self.map, 0, self.count)
+
+    def tail(self, n):
+        """Return the last n entries, oldest first."""
+        size = HISTORY_RECORD.size
+        base = HISTORY_HEADER.size
+        with self.lock:
+            n = min(n, self.count, self.slots)
+            start = (self.count - n) % self.slots
+            end = start + n
+            data = self.map[base + start * size:base + min(end, self.slots) * size]
+            if end > self.slots:
+                data += self.map[base:base + (end - self.slots) * size]
+        entries = []
+        for timestamp, job_id, filename, status, client, detail in HISTORY_RECORD.iter_unpack(data):
+            entry = {
+                "timestamp": timestamp,
+                "job_id": unpack_str(job_id),
+                "filename": unpack_str(filename),
+                "status": unpack_str(status),
+            }
+            if client.strip(b"\0"):
+                entry["client"] = unpack_str(client)
+            if detail.strip(b"\0"):
+                key = "printer_response" if entry["status"] == "printed" else "error"
+                entry[key] = unpack_str(detail)
+            entries.append(entry)
+        return entries
+
+job_history = HistoryLog(HISTORY_FILE, HISTORY_SIZE)
+
 def record_history(entry):
-    """Keep a small rotating history in memory."""
+    """
+    Append an entry to the persistent history ring.
+    Timestamps are stored as time.time_ns() and formatted by /history.
+    """
     job_history.append(entry)
-    # cap history to last 200 entries
-    if len(job_history) > 200:
-        del job_history[0]
 
 # ----------------------
-# Worker thread
+# Work dir cleanup
 # ----------------------
-def worker_loop(worker_id):
-    logger.info(f"Worker {worker_id} started.")
+def sweep_work_folder():
+    """
+    Delete leftovers older than WORK_MAX_AGE (e.g. left by a crash): anything
+    in WORK_FOLDER, and upload spool files in UPLOAD_FOLDER, which are left
+    behind when a server process dies mid-upload.
+    """
+    cutoff = time.time() - WORK_MAX_AGE
+    sweep_folder(WORK_FOLDER, "", cutoff)
+    sweep_folder(UPLOAD_FOLDER, UPLOAD_SPOOL_PREFIX, cutoff)
+
+def sweep_folder(folder, prefix, cutoff):
+    """Delete entries in folder whose names start with prefix and are older than cutoff."""
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.startswith(prefix):
+                continue
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+def cleanup_loop():
+    next_sweep = time.monotonic()
     while True:
-        job = job_queue.get()
-        if job is None:
-            logger.info(f"Worker {worker_id} received shutdown signal.")
-            break
+        wait = next_sweep - time.monotonic()
+        if wait <= 0:
+            try:
+                sweep_work_folder()
+            except Exception:
+                logger.exception("Work folder sweep failed")
+            next_sweep = time.monotonic() + SWEEP_INTERVAL
+            continue
         try:
-            logger.info(f"Worker {worker_id} processing job {job['id']} file={job['filename']}")
-            record_history({
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "job_id": job['id'],
-                "filename": job['filename'],
-                "status": "processing",
-                "client": job.get("client"),
-            })
-
-            # create isolated temp dir for conversion
-            with tempfile.TemporaryDirectory(dir=WORK_FOLDER) as tmpdir:
-                # copy input file to tmpdir to avoid issues with mount permissions
-                tmp_input = os.path.join(tmpdir, secure_filename(job['filename']))
-                shutil.copy(job['filepath'], tmp_input)
-
-                ext = job['filename'].rsplit(".", 1)[1].lower()
-                if ext == "pdf":
-                    pdf_path = tmp_input
-                else:
-                    # convert other office files to pdf
-                    try:
-                        pdf_path = convert_to_pdf(tmp_input, tmpdir)
-                    except Exception as e:
-                        logger.exception("Conversion failed")
-                        record_history({
-                            "timestamp": datetime.utcnow().isoformat() + "Z",
-                            "job_id": job['id'],
-                            "filename": job['filename'],
-                            "status": "conversion_failed",
-                            "error": str(e)
-                        })
+            tmpdir = cleanup_queue.get(timeout=wait)
+        except queue.Empty:
+            continue
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+# smallest useful .docx: one paragraph, just the parts Word/LibreOffice need
+WARMUP_DOCX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/officeDocument" Target="word/document.xml"/>'
+        '</Relationships>'),
+    "word/document.xml": (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        '<w:body><w:p><w:r><w:t>Stark warmup</w:t></w:r></w:p></w:body>'
+        '</w:document>'),
+}
+
+def warmup_office():
+    """
+    Run one throwaway docx conversion so soffice has its libraries, fonts
+    and import/export filters loaded before the first real job.
+    """
+    tmpdir = tempfile.mkdtemp(dir=WORK_FOLDER)
+    try:
+        path = os.path.join(tmpdir, "warmup.docx")
+        with zipfile.ZipFile(path, "w") as docx:
+            for name, data in WARMUP_DOCX_PARTS.items():
+                docx.writestr(name, data)
+        started = time.monotonic()
+        convert_to_pdf(path, tmpdir)
+        logger.info(f"LibreOffice warmed up in {time.monotonic() - started:.1f}s")
+    except Exception:
+        logger.exception("LibreOffice warmup failed")
+    finally:
+        cleanup_queue.put(tmpdir)
+
+def event_loop():
+    """Record history events sent back by the worker processes."""
+    while True:
+        record_history(event_queue.get())
+
+# ----------------------
+# Worker processes
+# ----------------------
+def record_job(job, status, **fields):
+    """Queue a history event for job."""
+    event_queue.put({
+        "timestamp": time.time_ns(),
+        "job_id": job['id'],
+        "filename": job['filename'],
+        "status": status,
+        **fields,
+    })
+
+def process_batch(batch, job_done):
+    """
+    Convert and print a batch. Each job's upload is removed and
+    job_done(job) called as soon as the job reaches a terminal status.
+    """
+    for job in batch:
+        logger.info(f"Worker {worker_id} processing job {job['id']} file={job['filename']}")
+        record_job(job, "processing", client=job.get("client"))
+
+    # jobs that already have a terminal status; one job's failure must not
+    # take the rest of the batch with it
+    finished = set()
+
+    def finish(n, status, **fields):
+        job = batch[n]
+        record_job(job, status, **fields)
+        finished.add(n)
+        # cleanup uploaded file (safe removal)
+        try:
+            os.remove(job['filepath'])
+        except Exception:
+            pass
+        job_done(job)
+
+    def fail(n, error):
+        logger.error(f"Job {batch[n]['id']} failed: {error}")
+        finish(n, "failed", error=str(error))
+
+    # PDFs print straight from the upload; only office files need a work dir
+    office_jobs = [n for n, job in enumerate(batch) if job['ext'] != "pdf"]
+    tmpdir = None
+    try:
+        inputs = {}
+        if office_jobs:
+            tmpdir = tempfile.mkdtemp(dir=WORK_FOLDER)
+            # link input files into tmpdir to avoid issues with mount permissions;
+            # the index prefix keeps same-named uploads apart
+            for n in office_jobs:
+                job = batch[n]
+                tmp_input = os.path.join(tmpdir, f"{n}_{job['filename']}")
+                try:
+                    link_or_copy(job['filepath'], tmp_input)
+                    inputs[n] = tmp_input
+                except Exception as e:
+                    fail(n, e)
+
+        # the CLI converts the whole batch in one soffice run; over UNO each
+        # document is converted right before it prints, so the first job
+        # doesn't wait for the rest of the batch
+        converted = {}
+        if uno is None and inputs:
+            converted = convert_batch_to_pdf(list(inputs.values()), tmpdir)
+
+        for n, job in enumerate(batch):
+            if n in finished:
+                continue
+            try:
+                if n in inputs:
+                    pdf_path = converted.get(inputs[n])
+                    if pdf_path is None:
+                        try:
+                            pdf_path = convert_to_pdf(inputs[n], tmpdir)
+                        except Exception as e:
+                            pdf_path = e
+                    if isinstance(pdf_path, Exception):
+                        logger.error(f"Job {job['id']} conversion failed: {pdf_path}")
+                        finish(n, "conversion_failed", error=str(pdf_path))
                         continue
+                else:
+                    pdf_path = job['filepath']
 
                 # print
-                ok, msg = print_pdf(pdf_path)
+                ok, msg = print_document(pdf_path, title=job['id'])
                 if ok:
                     logger.info(f"Job {job['id']} printed successfully.")
-                    record_history({
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                        "job_id": job['id'],
-                        "filename": job['filename'],
-                        "status": "printed",
-                        "printer_response": msg
-                    })
+                    finish(n, "printed", printer_response=msg)
                 else:
                     logger.error(f"Job {job['id']} print failed: {msg}")
-                    record_history({
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                        "job_id": job['id'],
-                        "filename": job['filename'],
-                        "status": "print_failed",
-                        "error": msg
-                    })
+                    finish(n, "print_failed", error=msg)
+            except Exception as e:
+                fail(n, e)
+    except Exception as e:
+        # e.g. no work dir or the batch conversion itself blew up
+        logger.exception("Batch failed")
+        for n in range(len(batch)):
+            if n not in finished:
+                fail(n, e)
+    finally:
+        # removal happens on the cleanup thread, off the job path
+        if tmpdir is not None:
+            cleanup_queue.put(tmpdir)
 
-        except Exception as e:
-            logger.exception("Unhandled exception in worker")
-        finally:
-            # cleanup uploaded file (safe removal)
+def worker_main(index, conn):
+    """
+    Worker process: own one LibreOffice instance and run the batches sent
+    over conn. Sends the id of each job as it finishes and None after
+    each batch; a None batch stops the worker.
+    """
+    global worker_id
+    # handlers inherited through fork (e.g. gunicorn's, which only flag the
+    # worker to stop) would keep the server from terminating this process;
+    # Ctrl-C reaches the whole process group, but the server stops us itself
+    for sig in (signal.SIGTERM, signal.SIGQUIT):
+        signal.signal(sig, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = index + 1
+    logger.info(f"Worker {worker_id} started (pid {os.getpid()}).")
+    # if the instance fails to start here it is retried on first use
+    instance = OfficeInstance(index)
+    try:
+        instance.start()
+    except Exception:
+        logger.exception(f"Failed to start LibreOffice instance {index}")
+    office_pool.put(instance)
+    # warm up in the background; the first batch waits for the instance anyway
+    threading.Thread(target=warmup_office, daemon=True).start()
+    try:
+        while True:
+            batch = conn.recv()
+            if batch is None:
+                break
+            process_batch(batch, lambda job: conn.send(job['id']))
+            conn.send(None)
+    except EOFError:
+        pass  # the server process is gone
+    finally:
+        logger.info(f"Worker {worker_id} stopping.")
+        instance.stop()
+
+# ----------------------
+# Dispatcher (server process)
+# ----------------------
+class Worker:
+    """
+    Server-side handle on one worker process. A dispatch thread hands it a
+    batch and waits; if the process dies, only that batch's unfinished
+    jobs are lost and the process is started again for the next batch.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.proc = None
+        self.conn = None
+
+    def start(self):
+        self.conn, child_conn = mp.Pipe()
+        self.proc = mp.Process(target=worker_main, args=(self.index, child_conn),
+                               name=f"stark-worker-{self.index + 1}", daemon=True)
+        self.proc.start()
+        child_conn.close()
+
+    def run(self, batch):
+        """Run batch on the worker process. Returns the jobs it did not finish."""
+        if not self.proc.is_alive():
+            if shutting_down.is_set():
+                raise RuntimeError("server shutting down")
+            logger.error(f"Worker {self.index + 1} exited with code {self.proc.exitcode}; restarting it")
+            self.start()
+        pending = {job['id']: job for job in batch}
+        try:
+            self.conn.send(batch)
+            while True:
+                # the sentinel is ready once the process has died
+                ready = multiprocessing.connection.wait([self.conn, self.proc.sentinel])
+                if self.conn not in ready:
+                    break
+                job_id = self.conn.recv()
+                if job_id is None:
+                    return []
+                pending.pop(job_id, None)
+        except (EOFError, OSError):
+            pass
+        self.proc.join()
+        return list(pending.values())
+
+    def stop(self):
+        """Ask the worker to stop itself and its LibreOffice instance after its batch."""
+        if self.proc.is_alive():
             try:
-                os.remove(job['filepath'])
-            except Exception:
+                self.conn.send(None)
+            except OSError:
                 pass
-            job_queue.task_done()
 
-# Start worker threads
-for i in range(WORKER_COUNT):
-    t = threading.Thread(target=worker_loop, args=(i+1,), daemon=True)
-    t.start()
+    def join(self, timeout):
+        """Wait for the worker to stop; after timeout seconds kill it instead."""
+        self.proc.join(timeout)
+        if self.proc.is_alive():
+            logger.warning(f"Worker {self.index + 1} did not finish in time; killing it")
+            self.proc.kill()
+            self.proc.join()
+            # the worker had no chance to stop its soffice
+            OfficeInstance(self.index).kill_stale()
+
+def acquire_worker():
+    """Block until a worker has no batch, and claim it."""
+    return idle_workers.get()
+
+def release_worker(worker):
+    idle_workers.put(worker)
+
+def next_batch():
+    """
+    Block for the next job and gather a batch for the claimed worker.
+    If other workers are idle, the jobs already queued are shared out
+    between them without waiting. Otherwise up to BATCH_SIZE jobs that
+    arrive within MAX_BATCH_WAIT_MS are collected. Returns (jobs, stop),
+    where stop means a shutdown sentinel was taken off the queue.
+    """
+    job = job_queue.get()
+    if job is None:
+        return [], True
+    batch = [job]
+    others_idle = idle_workers.qsize()
+    if others_idle:
+        # this worker's share of everything queued, rounded up
+        share = -(-(job_queue.qsize() + 1) // (others_idle + 1))
+        while len(batch) < min(BATCH_SIZE, share):
+            try:
+                job = job_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    deadline = time.monotonic() + MAX_BATCH_WAIT_MS / 1000
+    while len(batch) < BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            job = job_queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if job is None:
+            return batch, True
+        batch.append(job)
+    return batch, False
+
+# one worker process per LibreOffice instance, and one dispatch thread per
+# worker waiting on the batch it runs
+workers = [Worker(i) for i in range(WORKER_COUNT)]
+executor = ThreadPoolExecutor(max_workers=WORKER_COUNT, thread_name_prefix="stark-wk")
+# workers without a batch; the dispatcher only gathers a batch for an idle one
+idle_workers = queue.Queue()
+# set by shutdown_workers; dead workers are no longer restarted
+shutting_down = threading.Event()
+
+def fail_batch(batch, error, status="failed"):
+    """Record jobs that no worker will finish and remove their uploads."""
+    logger.error(f"{len(batch)} job(s) {status}: {error}")
+    for job in batch:
+        record_history({
+            "timestamp": time.time_ns(),
+            "job_id": job['id'],
+            "filename": job['filename'],
+            "status": status,
+            "error": str(error)
+        })
+        try:
+            os.remove(job['filepath'])
+        except Exception:
+            pass
+
+def batch_done(future, worker, batch):
+    for job in batch:
+        job_futures.pop(job['id'], None)
+    release_worker(worker)
+    error = future.exception()
+    unfinished = batch if error is not None else future.result()
+    if not unfinished:
+        return
+    if shutting_down.is_set():
+        fail_batch(unfinished, "server shutting down", status="cancelled")
+    elif error is not None:
+        # e.g. the worker process could not be restarted
+        fail_batch(unfinished, repr(error))
+    else:
+        fail_batch(unfinished, f"worker {worker.index + 1} died")
+
+def submit_batch(worker, batch):
+    future = executor.submit(worker.run, batch)
+    for job in batch:
+        job_futures[job['id']] = future
+    future.add_done_callback(lambda f: batch_done(f, worker, batch))
+
+def dispatch_loop():
+    stop = False
+    while not stop:
+        worker = acquire_worker()
+        batch, stop = next_batch()
+        if not batch:
+            release_worker(worker)
+            continue
+        try:
+            submit_batch(worker, batch)
+        except Exception as e:
+            logger.exception("Failed to dispatch batch")
+            release_worker(worker)
+            fail_batch(batch, repr(e))
+    logger.info("Dispatcher received shutdown signal.")
+
+# Fork the worker processes before the dispatcher, log listener, history
+# and cleanup threads exist. (The multiprocessing queue feeder threads
+# already run; those queues reset themselves after fork. A worker restarted
+# after a crash is forked from its dispatch thread.) Each worker kills any
+# soffice a dead predecessor left.
+for worker in workers:
+    worker.start()
+    idle_workers.put(worker)
+dispatcher = threading.Thread(target=dispatch_loop, name="stark-dispatch", daemon=True)
+dispatcher.start()
+log_listener.start()
+threading.Thread(target=event_loop, daemon=True).start()
+threading.Thread(target=cleanup_loop, daemon=True).start()
 
 # ----------------------
 # Flask endpoints
@@ -250,31 +1181,30 @@ def upload():
     if not allowed_file(filename):
         return jsonify({"error": f"Unsupported file type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}"}), 400
 
-    # size already limited by MAX_CONTENT_LENGTH but double-check
-    f.stream.seek(0, os.SEEK_END)
-    size = f.stream.tell()
-    f.stream.seek(0)
-    if size > app.config['MAX_CONTENT_LENGTH']:
-        return jsonify({"error": f"File too large (> {MAX_FILE_SIZE_MB} MB)"}), 413
+    # size is enforced by MAX_CONTENT_LENGTH (413) before we get here
+    # filename is already sanitized; parse the extension once for the worker
+    ext = file_ext(filename)
 
-    # save to upload folder under unique name
-    timestamp = int(time.time() * 1000)
-    unique_name = f"{timestamp}_{filename}"
+    # save to upload folder under a unique name; request threads run
+    # concurrently, so a millisecond timestamp is not unique enough
+    received_ns = time.time_ns()
+    job_id = f"job-{uuid.uuid4().hex[:20]}"  # fits the history record's job_id field
+    unique_name = f"{job_id}_{filename}"
     save_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_name)
     try:
-        f.save(save_path)
+        save_upload(f, save_path)
     except Exception as e:
         logger.exception("Failed to save uploaded file")
         return jsonify({"error": "Failed to save file"}), 500
 
     # push job to queue
-    job_id = f"job-{timestamp}"
     job = {
         "id": job_id,
         "filename": filename,
+        "ext": ext,
         "filepath": save_path,
         "client": request.remote_addr,
-        "received_at": datetime.utcnow().isoformat() + "Z"
+        "received_at": received_ns
     }
     job_queue.put(job)
     record_history({
@@ -292,25 +1222,69 @@ def upload():
 def health():
     return jsonify({"status": "ok", "queue_size": job_queue.qsize()}), 200
 
+@app.route("/status/<job_id>", methods=["GET"])
+def status(job_id):
+    future = job_futures.get(job_id)
+    if future is not None:
+        return jsonify({"job_id": job_id, "status": "processing" if future.running() else "dispatched"}), 200
+    for entry in reversed(job_history.tail(HISTORY_SIZE)):
+        if entry["job_id"] == job_id:
+            return jsonify({"job_id": job_id, "status": entry["status"]}), 200
+    return jsonify({"error": "Unknown job"}), 404
+
 @app.route("/history", methods=["GET"])
 def history():
     # return last N history entries
-    return jsonify({"history": job_history[-100:]}), 200
+    entries = [
+        dict(entry, timestamp=format_timestamp(entry["timestamp"]))
+        for entry in job_history.tail(100)
+    ]
+    return jsonify({"history": entries}), 200
 
 # ----------------------
 # Graceful shutdown handling (optional)
 # ----------------------
+def cancel_queued():
+    """Fail jobs that are still waiting in job_queue."""
+    jobs = []
+    while True:
+        try:
+            job = job_queue.get_nowait()
+        except queue.Empty:
+            break
+        if job is not None:
+            jobs.append(job)
+    if jobs:
+        fail_batch(jobs, "server shutting down", status="cancelled")
+
 def shutdown_workers():
     logger.info("Shutting down workers...")
-    for _ in range(WORKER_COUNT):
-        job_queue.put(None)  # sentinel
+    # only in-flight batches are finished; queued jobs would not survive a restart
+    cancel_queued()
+    job_queue.put(None)  # sentinel for the dispatcher
+    # in-flight batches get SHUTDOWN_TIMEOUT in total; workers still busy
+    # after that are killed and their unfinished jobs recorded as cancelled
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    # the dispatcher exits once a worker is free to take the sentinel
+    dispatcher.join(SHUTDOWN_TIMEOUT)
+    shutting_down.set()
+    for worker in workers:
+        worker.stop()
+    for worker in workers:
+        worker.join(max(0, deadline - time.monotonic()))
+    # the executor must outlive the dispatcher or its last submit fails
+    dispatcher.join()
+    cancel_queued()  # uploads that arrived after the sentinel
+    executor.shutdown(wait=True)
+    logger.info("Server exiting.")
+    log_listener.stop()  # flushes queued records
 
 if __name__ == "__main__":
+    # development server only; production runs under gunicorn (gunicorn.conf.py)
     try:
-        logger.info("Starting Stark server...")
-        app.run(host=SERVER_HOST, port=SERVER_PORT)
+        logger.info("Starting Stark server (development)...")
+        app.run(host=SERVER_HOST, port=SERVER_PORT, threaded=True)
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received.")
     finally:
         shutdown_workers()
-        logger.info("Server exiting.")
@@ -1,5 +1,6 @@
 import os
 import platform
+import threading
 import requests
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
@@ -9,6 +10,12 @@ from kivy.uix.textinput import TextInput
 from kivy.clock import mainthread
 from kivy.core.window import Window
 
+# Streaming multipart encoder; without it requests builds the whole body in memory
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
 # Android native filechooser via plyer
 try:
     from plyer import filechooser
@@ -20,6 +27,11 @@ if platform.system() == "Windows":
     import tkinter as tk
     from tkinter import filedialog
 
+UPLOAD_URL = "http://192.168.1.13:5000/upload"
+
+# one session so uploads reuse the TCP connection to the server
+SESSION = requests.Session()
+
 
 class StarkLayout(BoxLayout):
     def __init__(self, **kwargs):
@@ -97,21 +109,40 @@ class StarkLayout(BoxLayout):
     def set_status(self, text):
         self.status_label.text = text
 
+    @mainthread
+    def upload_finished(self):
+        self.upload_btn.disabled = False
+
     def upload_file(self, instance):
         if not self.selected_file:
             self.set_status("No file selected.")
             return
+        # one upload at a time: repeat taps would print twice and share SESSION
+        if self.upload_btn.disabled:
+            return
+        self.upload_btn.disabled = True
 
         pages = self.page_input.text.strip()
         self.set_status("Uploading...")
+        # upload off the UI thread so the window keeps responding
+        threading.Thread(target=self.send_file, args=(self.selected_file, pages), daemon=True).start()
 
+    def send_file(self, path, pages):
         try:
-            with open(self.selected_file, 'rb') as f:
-                files = {'file': (os.path.basename(self.selected_file), f)}
-                data = {}
-                if pages:
-                    data['pages'] = pages
-                r = requests.post("http://192.168.1.13:5000/upload", files=files, data=data, timeout=30)
+            with open(path, 'rb') as f:
+                file_field = (os.path.basename(path), f)
+                if MultipartEncoder:
+                    fields = {'file': file_field}
+                    if pages:
+                        fields['pages'] = pages
+                    encoder = MultipartEncoder(fields=fields)
+                    r = SESSION.post(UPLOAD_URL, data=encoder,
+                                     headers={'Content-Type': encoder.content_type}, timeout=30)
+                else:
+                    data = {}
+                    if pages:
+                        data['pages'] = pages
+                    r = SESSION.post(UPLOAD_URL, files={'file': file_field}, data=data, timeout=30)
 
             if r.status_code == 200:
                 self.set_status("Upload successful ✅")
@@ -119,6 +150,8 @@ class StarkLayout(BoxLayout):
                 self.set_status(f"Server error: {r.text}")
         except Exception as e:
             self.set_status(f"Upload failed: {e}")
+        finally:
+            self.upload_finished()
 
 
 class StarkApp(App):